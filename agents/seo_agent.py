@@ -1,6 +1,180 @@
-import json
+import asyncio
+import contextlib
+import copy
+import functools
+import hashlib
+import httpx
+import ollama
 import requests
-from typing import Dict, List
+import time
+import weakref
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import (OLLAMA_KEEP_ALIVE, OLLAMA_NUM_CTX, OLLAMA_NUM_PARALLEL, RESPONSE_CACHE_DIR,
+                    RESPONSE_CACHE_TTL)
+from utils import json_compat
+
+try:
+    import diskcache
+except ImportError:  # optional: responses are then only cached in memory
+    diskcache = None
+
+# Seconds a /api/tags result is reused before Ollama is probed again
+_TAGS_TTL = 5.0
+
+# Display names for the SEOAnalyzer categories that report issues
+_CAT_NAMES = {
+    'title_analysis': 'Title',
+    'meta_description_analysis': 'Meta Description',
+    'content_analysis': 'Content',
+    'header_analysis': 'Header',
+    'image_analysis': 'Image',
+    'link_analysis': 'Link',
+    'technical_seo': 'Technical Seo'
+}
+
+# Transient Ollama failures worth retrying (server restarting or overloaded)
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset(["GET", "POST"]),
+    raise_on_status=False
+)
+
+# Sites packed into a single batch prompt; larger sets are split and gathered
+_BATCH_SIZE = 8
+
+# Token budget for one site's reply; the full response schema doesn't fit in 256
+_ANALYSIS_MAX_TOKENS = 1024
+
+# Response shape requested from the model
+_RESPONSE_KEYS = "summary, recommendations[{title,description,priority}], quick_wins[], long_term_strategies[]"
+
+# Most issues listed in an analysis prompt; later ones add tokens but rarely change the advice
+_MAX_PROMPT_ISSUES = 8
+
+
+@functools.lru_cache(maxsize=128)
+def _fallback_for(issues_key: Tuple[str, ...]) -> Tuple:
+    """Fallback (summary, recommendations, quick_wins, long_term_strategies) for the given issues"""
+    # Create recommendations based on issues
+    if issues_key:
+        recommendations = tuple(
+            (f'Address Issue {i+1}', issue, 'high' if i < 2 else 'medium' if i < 4 else 'low')
+            for i, issue in enumerate(issues_key)
+        )
+    else:
+        # Default recommendations if no issues
+        recommendations = (
+            ('Optimize Title Tag', 'Ensure title is 50-60 characters with primary keyword', 'high'),
+            ('Improve Meta Description', 'Write compelling meta description of 120-160 characters', 'high'),
+            ('Enhance Content', 'Aim for at least 300 words of quality, relevant content', 'medium')
+        )
+    
+    return (
+        'Based on technical SEO analysis, here are the key recommendations for improvement.',
+        recommendations,
+        (
+            'Fix meta tags if needed',
+            'Add alt text to images without it',
+            'Ensure fast page loading'
+        ),
+        (
+            'Regular content updates and optimization',
+            'Build quality backlinks',
+            'Monitor SEO performance regularly'
+        )
+    )
+
+
+class ModelNotFoundError(Exception):
+    """Ollama is reachable but does not have the requested model"""
+
+
+class _JSONEndDetector:
+    """Track bracket depth across streamed chunks to spot the end of the first JSON value"""
+    
+    def __init__(self):
+        # Text streamed so far, the next index to scan and where the current value began
+        self.text = ''
+        self.pos = 0
+        self.start = -1
+        # Whichever of "{" / "[" comes first decides the pair to track, as in the parsers
+        self.opener = None
+        self.closer = None
+        self.depth = 0
+        self.has_object = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk, True once the first top-level object (or array of objects) has closed"""
+        self.text += chunk
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            self.pos += 1
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif self.opener is None:
+                # Quotes only matter inside the value; prose before it may contain stray ones
+                if ch in '{[':
+                    self.start = self.pos - 1
+                    self.opener = ch
+                    self.closer = '}' if ch == '{' else ']'
+                    self.depth = 1
+                    self.has_object = ch == '{'
+            elif ch == '"':
+                self.in_string = True
+            elif ch == self.opener:
+                self.depth += 1
+            elif ch == '{':
+                self.has_object = True
+            elif ch == self.closer:
+                self.depth -= 1
+                if self.depth == 0:
+                    if self.has_object and self._is_json(self.text[self.start:self.pos]):
+                        return True
+                    # A bracketed aside like "[1]" or "{keyword}" in prose; rescan just
+                    # past its opener, since the real JSON may start inside it
+                    self.pos = self.start + 1
+                    self.opener = None
+        return False
+    
+    @staticmethod
+    def _is_json(span: str) -> bool:
+        """Whether a balanced span decodes as JSON"""
+        try:
+            json_compat.loads(span)
+            return True
+        except json_compat.JSONDecodeError:
+            return False
+
+
+async def _gather_bounded(coros, limit: int = OLLAMA_NUM_PARALLEL) -> List:
+    """asyncio.gather that keeps at most `limit` requests in flight"""
+    # Don't queue more requests than the server will run in parallel
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+    
+    return list(await asyncio.gather(*[bounded(c) for c in coros]))
+
+
+def _close_resources(session: requests.Session, disk_cache):
+    """Close an agent's HTTP session and disk cache"""
+    session.close()
+    if disk_cache is not None:
+        disk_cache.close()
+
 
 class SEOAgent:
     def __init__(self, model_name: str = "gemma3:latest"):
@@ -8,67 +182,184 @@ class SEOAgent:
         self.conversation_history = []
         self.base_url = "http://localhost:11434"
         
+        # Reuse one pooled session for every Ollama call (keep-alive connections)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=_RETRY)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Parsed LLM recommendations keyed by _cache_key
+        self._cache: Dict[str, Dict] = {}
+        self._disk_cache = diskcache.Cache(RESPONSE_CACHE_DIR) if diskcache else None
+        # Runs on close(), garbage collection or exit; holds no reference to self
+        self._finalizer = weakref.finalize(self, _close_resources, self.session, self._disk_cache)
+        
+        # (timestamp, models) from the last /api/tags probe, models is None if Ollama was down
+        self._tags_cache: Optional[Tuple[float, Optional[List[str]]]] = None
+    
+    def close(self):
+        """Close the underlying HTTP session and the on-disk response cache"""
+        self._finalizer()
+        
+    def _cached_models(self) -> Tuple[bool, Optional[List[str]]]:
+        """Return (fresh, models) from the last /api/tags probe"""
+        if self._tags_cache is not None:
+            timestamp, models = self._tags_cache
+            if time.monotonic() - timestamp < _TAGS_TTL:
+                return True, models
+        return False, None
+    
+    def _store_models(self, models: Optional[List[str]]):
+        self._tags_cache = (time.monotonic(), models)
+    
+    def _fetch_models(self) -> Optional[List[str]]:
+        """Probe /api/tags (cached for a few seconds), None if Ollama is not running"""
+        fresh, models = self._cached_models()
+        if fresh:
+            return models
+        
+        models = None
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
+            if response.status_code == 200:
+                data = json_compat.loads(response.content)
+                models = [model['name'] for model in data.get('models', [])]
+        except Exception:
+            pass
+        
+        self._store_models(models)
+        return models
+    
     def check_ollama_running(self):
         """Check if Ollama is running"""
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        return self._fetch_models() is not None
     
     def get_available_models(self):
         """Get available models from Ollama"""
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                return [model['name'] for model in data.get('models', [])]
-        except:
-            return []
+        return self._fetch_models() or []
     
-    def generate_with_ollama(self, prompt: str, model: str = None) -> str:
-        """Generate response using Ollama API directly"""
+    def generate_with_ollama(self, prompt: str, model: str = None, stop_at_json: bool = False,
+                             max_tokens: int = _ANALYSIS_MAX_TOKENS) -> Iterator[str]:
+        """Stream response chunks from the Ollama API
+        
+        With stop_at_json the stream is cut as soon as the first JSON object closes,
+        so we don't wait for any trailing prose the model adds after it.
+        """
         if model is None:
             model = self.model
-            
+        
+        detector = _JSONEndDetector() if stop_at_json else None
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,
-                        "num_predict": 512
-                    }
-                },
+                json={**self._generate_params(prompt, model, max_tokens), "stream": True},
+                stream=True,
                 timeout=60
             )
             
-            if response.status_code == 200:
-                return response.json().get('response', '')
-            else:
-                print(f"Ollama API error: {response.status_code}")
-                return ""
+            with contextlib.closing(response):
+                if response.status_code != 200:
+                    print(f"Ollama API error: {response.status_code}")
+                    return
+                
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json_compat.loads(line)
+                    text = chunk.get('response', '')
+                    if text:
+                        yield text
+                    if chunk.get('done_reason') == 'length':
+                        # Already streamed to the caller, so all we can do is say so
+                        print(f"Ollama reply was cut off at {max_tokens} tokens")
+                    if chunk.get('done') or (detector and detector.feed(text)):
+                        break
                 
         except Exception as e:
             print(f"Error calling Ollama API: {e}")
-            return ""
     
-    def analyze_and_advise(self, page_data: Dict, seo_analysis: Dict) -> Dict:
-        """Generate SEO recommendations"""
+    def generate_full(self, prompt: str, model: str = None, stop_at_json: bool = False,
+                      max_tokens: int = _ANALYSIS_MAX_TOKENS) -> str:
+        """Generate a complete response using Ollama API directly"""
+        return "".join(self.generate_with_ollama(prompt, model, stop_at_json, max_tokens))
+    
+    def _generate_params(self, prompt: str, model: str, max_tokens: int = _ANALYSIS_MAX_TOKENS) -> Dict:
+        """Build the generate request body shared by the sync and async clients"""
+        return {
+            "model": model,
+            "prompt": prompt,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {
+                "temperature": 0.1,
+                "num_predict": max_tokens,
+                # Constant on purpose: Ollama reloads the model whenever num_ctx changes
+                "num_ctx": OLLAMA_NUM_CTX
+            }
+        }
+    
+    def _async_client(self) -> ollama.AsyncClient:
+        """Async Ollama client that retries failed connection attempts"""
+        return ollama.AsyncClient(
+            host=self.base_url,
+            timeout=60,
+            transport=httpx.AsyncHTTPTransport(retries=_RETRY.total)
+        )
+    
+    async def _amodels(self, client: ollama.AsyncClient) -> Optional[List[str]]:
+        """Get available models asynchronously, None if Ollama is not running"""
+        fresh, models = self._cached_models()
+        if fresh:
+            return models
         
-        # First, check if Ollama is running and get available models
-        if not self.check_ollama_running():
+        try:
+            response = await client.list()
+            models = [m.model for m in response.models]
+        except Exception as e:
+            print(f"Error listing Ollama models: {e}")
+            models = None
+        
+        self._store_models(models)
+        return models
+    
+    async def _agenerate(self, client: ollama.AsyncClient, prompt: str, model: str = None,
+                         stop_at_json: bool = False, max_tokens: int = _ANALYSIS_MAX_TOKENS) -> str:
+        """Generate response using the async Ollama client"""
+        if model is None:
+            model = self.model
+        
+        detector = _JSONEndDetector() if stop_at_json else None
+        parts = []
+        try:
+            stream = await client.generate(**self._generate_params(prompt, model, max_tokens), stream=True)
+            async with contextlib.aclosing(stream):
+                async for chunk in stream:
+                    text = chunk.get('response', '')
+                    parts.append(text)
+                    if chunk.get('done_reason') == 'length':
+                        # A reply cut off mid-JSON would only parse into a fallback
+                        print(f"Ollama reply was cut off at {max_tokens} tokens")
+                        return ""
+                    if detector and detector.feed(text):
+                        break
+            return "".join(parts)
+        except ollama.ResponseError as e:
+            if e.status_code == 404:
+                raise ModelNotFoundError(model) from e
+            print(f"Ollama API error: {e.status_code}")
+            return ""
+        except Exception as e:
+            print(f"Error calling Ollama API: {e}")
+            return ""
+    
+    def _select_model(self, available_models: Optional[List[str]]) -> bool:
+        """Switch to an available model if needed, False if none can be used"""
+        if available_models is None:
             print("Ollama is not running. Using fallback recommendations.")
-            return self._generate_fallback_recommendations(seo_analysis)
+            return False
         
-        # Get available models
-        available_models = self.get_available_models()
         if not available_models:
             print("No models available. Using fallback recommendations.")
-            return self._generate_fallback_recommendations(seo_analysis)
+            return False
         
         # Check if our model is available
         if self.model not in available_models:
@@ -78,26 +369,167 @@ class SEOAgent:
             print(f"Switching to model: {self.model}")
         
         print(f"Using model: {self.model}")
+        return True
+    
+    def _recommendations_from(self, response: str, seo_analysis: Dict) -> Tuple[Dict, bool]:
+        """Turn a raw model response into recommendations, and whether the model's JSON was used"""
+        if response:
+            print(f"Received response from Ollama")
+            return self._parse_response(response)
         
-        # Create prompt
-        prompt = self._create_analysis_prompt(page_data, seo_analysis)
+        print("No response from Ollama. Using fallback.")
+        return self._generate_fallback_recommendations(seo_analysis), False
+    
+    def _cache_key(self, page_data: Dict, seo_analysis: Dict) -> str:
+        """Fingerprint the inputs that actually shape the prompt"""
+        issues = sorted(
+            issue
+            for data in seo_analysis.values() if isinstance(data, dict)
+            for issue in data.get('issues', ())
+        )
+        fingerprint = json_compat.dumps({
+            'title': page_data.get('title', ''),
+            'desc': page_data.get('meta_description', ''),
+            'issues': issues,
+            'score': seo_analysis.get('score', 0),
+            'model': self.model
+        }, sort_keys=True)
+        return hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _get_cached(self, key: str) -> Optional[Dict]:
+        """Look up cached recommendations in memory, then on disk"""
+        # Callers get their own copy so changing a result can't change the cache
+        if key in self._cache:
+            return copy.deepcopy(self._cache[key])
+        if self._disk_cache is not None:
+            cached = self._disk_cache.get(key)
+            if cached is not None:
+                self._cache[key] = cached
+                return copy.deepcopy(cached)
+        return None
+    
+    def _set_cached(self, key: str, recommendations: Dict):
+        """Store recommendations produced by the model"""
+        self._cache[key] = copy.deepcopy(recommendations)
+        if self._disk_cache is not None:
+            self._disk_cache.set(key, recommendations, expire=RESPONSE_CACHE_TTL)
+    
+    async def _agenerate_analysis(self, client: ollama.AsyncClient, prompt: str,
+                                  max_tokens: int = _ANALYSIS_MAX_TOKENS) -> str:
+        """Generate analysis JSON, switching models once if ours was removed from Ollama"""
+        try:
+            return await self._agenerate(client, prompt, stop_at_json=True,
+                                         max_tokens=max_tokens)
+        except ModelNotFoundError:
+            print(f"Model {self.model} is no longer available. Refreshing model list.")
         
-        # Generate response
-        response = self.generate_with_ollama(prompt)
+        self._tags_cache = None
+        if not self._select_model(await self._amodels(client)):
+            return ""
+        try:
+            return await self._agenerate(client, prompt, stop_at_json=True,
+                                         max_tokens=max_tokens)
+        except ModelNotFoundError:
+            print(f"Model {self.model} not found.")
+            return ""
+    
+    async def _aanalyze_cached(self, client: ollama.AsyncClient, page_data: Dict, seo_analysis: Dict) -> Dict:
+        """Return cached recommendations or generate and cache new ones"""
+        cached = self._get_cached(self._cache_key(page_data, seo_analysis))
+        if cached is not None:
+            print("Using cached recommendations")
+            return cached
         
-        if response:
-            print(f"Received response from Ollama")
-            recommendations = self._parse_response(response)
-        else:
-            print("No response from Ollama. Using fallback.")
-            recommendations = self._generate_fallback_recommendations(seo_analysis)
+        prompt = self._create_analysis_prompt(page_data, seo_analysis)
+        response = await self._agenerate_analysis(client, prompt)
+        recommendations, parsed = self._recommendations_from(response, seo_analysis)
         
+        # Only real model output is cached, so a failed reply is retried next time.
+        # The key is rebuilt because a missing model may have been swapped out.
+        if parsed:
+            self._set_cached(self._cache_key(page_data, seo_analysis), recommendations)
         return recommendations
     
+    async def analyze_and_advise_async(self, page_data: Dict, seo_analysis: Dict) -> Dict:
+        """Generate SEO recommendations without blocking on each Ollama call"""
+        async with self._async_client() as client:
+            # A single /api/tags probe tells us both whether Ollama is up and which models exist
+            if not self._select_model(await self._amodels(client)):
+                return self._generate_fallback_recommendations(seo_analysis)
+            
+            return await self._aanalyze_cached(client, page_data, seo_analysis)
+    
+    async def analyze_many_async(self, pages: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Generate recommendations for several (page_data, seo_analysis) pairs concurrently"""
+        async with self._async_client() as client:
+            if not self._select_model(await self._amodels(client)):
+                return [self._generate_fallback_recommendations(analysis) for _, analysis in pages]
+            
+            return await _gather_bounded(
+                self._aanalyze_cached(client, page_data, analysis) for page_data, analysis in pages
+            )
+    
+    async def _aanalyze_chunk(self, client: ollama.AsyncClient, pages: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Analyze up to _BATCH_SIZE pages with a single prompt"""
+        if len(pages) == 1:
+            return [await self._aanalyze_cached(client, *pages[0])]
+        
+        prompt = self._create_batch_prompt(pages)
+        response = await self._agenerate_analysis(client, prompt, max_tokens=_ANALYSIS_MAX_TOKENS * len(pages))
+        parsed = self._parse_batch_response(response, len(pages)) if response else [None] * len(pages)
+        
+        results = []
+        for (page_data, analysis), recommendations in zip(pages, parsed):
+            if recommendations is None:
+                recommendations = self._generate_fallback_recommendations(analysis)
+            else:
+                self._set_cached(self._cache_key(page_data, analysis), recommendations)
+            results.append(recommendations)
+        return results
+    
+    async def analyze_batch_async(self, pages: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Generate recommendations for several pages, packing up to _BATCH_SIZE sites per prompt"""
+        if len(pages) == 1:
+            return [await self.analyze_and_advise_async(*pages[0])]
+        
+        async with self._async_client() as client:
+            if not self._select_model(await self._amodels(client)):
+                return [self._generate_fallback_recommendations(analysis) for _, analysis in pages]
+            
+            # Only pages without a cached answer go to the model
+            results = [self._get_cached(self._cache_key(page_data, analysis)) for page_data, analysis in pages]
+            misses = [i for i, cached in enumerate(results) if cached is None]
+            chunks = [misses[i:i + _BATCH_SIZE] for i in range(0, len(misses), _BATCH_SIZE)]
+            
+            chunk_results = await _gather_bounded(
+                self._aanalyze_chunk(client, [pages[i] for i in chunk]) for chunk in chunks
+            )
+            for chunk, recommendations in zip(chunks, chunk_results):
+                for i, rec in zip(chunk, recommendations):
+                    results[i] = rec
+            return results
+    
+    def analyze_and_advise(self, page_data: Dict, seo_analysis: Dict) -> Dict:
+        """Generate SEO recommendations"""
+        return asyncio.run(self.analyze_and_advise_async(page_data, seo_analysis))
+    
+    def analyze_many(self, pages: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Generate SEO recommendations for several pages"""
+        return asyncio.run(self.analyze_many_async(pages))
+    
+    def analyze_batch(self, pages: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Generate SEO recommendations for several pages with batched prompts"""
+        return asyncio.run(self.analyze_batch_async(pages))
+    
     def chat(self, user_input: str, context: Dict = None) -> str:
         """Chat with the agent"""
+        return "".join(self.chat_stream(user_input, context))
+    
+    def chat_stream(self, user_input: str, context: Dict = None) -> Iterator[str]:
+        """Chat with the agent, yielding the reply as it is generated"""
         if not self.check_ollama_running():
-            return "Ollama is not running. Please start Ollama with: `ollama serve`"
+            yield "Ollama is not running. Please start Ollama with: `ollama serve`"
+            return
         
         context_prompt = self._create_chat_context(context) if context else ""
         
@@ -107,48 +539,56 @@ User: {user_input}
 
 SEO Expert: """
         
-        response = self.generate_with_ollama(full_prompt)
-        return response if response else "I apologize, but I couldn't generate a response at the moment."
+        received = False
+        # Free-form chat answers run longer than the JSON analysis
+        for chunk in self.generate_with_ollama(full_prompt, max_tokens=512):
+            received = True
+            yield chunk
+        if not received:
+            yield "I apologize, but I couldn't generate a response at the moment."
     
-    def _create_analysis_prompt(self, page_data: Dict, seo_analysis: Dict) -> str:
-        """Create analysis prompt"""
-        # Format issues
-        issues = []
-        for category, data in seo_analysis.items():
-            if isinstance(data, dict) and 'issues' in data:
-                for issue in data['issues']:
-                    # Clean up category name for display
-                    cat_name = category.replace('_analysis', '').replace('_', ' ').title()
-                    issues.append(f"{cat_name}: {issue}")
+    def _describe_site(self, page_data: Dict, seo_analysis: Dict) -> str:
+        """Summarize one analyzed page for a prompt"""
+        # Format issues, deduplicated and clipped to keep the prompt short
+        issues = [
+            f"{_CAT_NAMES.get(category, category)}: {issue}"
+            for category, data in seo_analysis.items() if isinstance(data, dict)
+            for issue in data.get('issues', ())
+        ]
+        issues = list(dict.fromkeys(issues))[:_MAX_PROMPT_ISSUES]
         
         issues_text = "\n".join(issues) if issues else "No major issues found"
         
-        # Create prompt
-        prompt = f"""As an expert SEO consultant, analyze this website and provide specific recommendations.
+        return f"""URL: {page_data.get('url', 'N/A')}
+Title: {page_data.get('title', 'N/A')} ({len(page_data.get('title', ''))} chars)
+Meta Description: {page_data.get('meta_description', 'N/A')} ({len(page_data.get('meta_description', ''))} chars)
+Word Count: {seo_analysis.get('content_analysis', {}).get('word_count', 0)}
+SEO Score: {seo_analysis.get('score', 0)}/100
 
-Website Analysis Data:
-- URL: {page_data.get('url', 'N/A')}
-- Title: {page_data.get('title', 'N/A')} (Length: {len(page_data.get('title', ''))} chars)
-- Meta Description: {page_data.get('meta_description', 'N/A')} (Length: {len(page_data.get('meta_description', ''))} chars)
-- Content Word Count: {seo_analysis.get('content_analysis', {}).get('word_count', 0)}
-- Overall SEO Score: {seo_analysis.get('score', 0)}/100
+Issues:
+{issues_text}"""
+    
+    def _create_analysis_prompt(self, page_data: Dict, seo_analysis: Dict) -> str:
+        """Create analysis prompt"""
+        return f"""As an expert SEO consultant, give specific recommendations for this website.
 
-Issues Identified:
-{issues_text}
+{self._describe_site(page_data, seo_analysis)}
 
-Please provide recommendations in this JSON format:
-{{
-  "summary": "Brief summary of the analysis",
-  "recommendations": [
-    {{"title": "Recommendation 1", "description": "Detailed description", "priority": "high/medium/low"}}
-  ],
-  "quick_wins": ["Quick fix 1", "Quick fix 2"],
-  "long_term_strategies": ["Long-term strategy 1", "Long-term strategy 2"]
-}}
+Reply with valid JSON matching keys {_RESPONSE_KEYS}. priority is high, medium or low.
+"""
+    
+    def _create_batch_prompt(self, pages: List[Tuple[Dict, Dict]]) -> str:
+        """Create one prompt covering several analyzed pages"""
+        sites = "\n\n".join(
+            f"### Site {i}\n{self._describe_site(page_data, analysis)}"
+            for i, (page_data, analysis) in enumerate(pages, 1)
+        )
+        return f"""As an expert SEO consultant, give specific recommendations for each of these {len(pages)} websites.
 
-Response:"""
-        
-        return prompt
+{sites}
+
+Reply with a valid JSON array of {len(pages)} objects, one per site in order, each matching keys {_RESPONSE_KEYS}. priority is high, medium or low.
+"""
     
     def _create_chat_context(self, context: Dict) -> str:
         """Create chat context"""
@@ -160,21 +600,20 @@ Response:"""
             context_str += f" with SEO score {context['score']}/100"
         return context_str
     
-    def _parse_response(self, response_text: str) -> Dict:
-        """Parse response from Ollama"""
+    def _parse_response(self, response_text: str) -> Tuple[Dict, bool]:
+        """Parse response from Ollama, flagging whether it held usable JSON"""
         try:
-            # Try to extract JSON from the response
-            # Look for JSON content
-            import re
+            # Fast path: the model replied with bare JSON
+            stripped = response_text.strip()
+            if stripped.startswith('{') and stripped.endswith('}'):
+                return json_compat.loads(stripped), True
             
-            # Try to find JSON object
-            json_pattern = r'\{[\s\S]*\}'
-            match = re.search(json_pattern, response_text)
+            # Otherwise take the span from the first "{" to the last "}"
+            start = response_text.find('{')
+            end = response_text.rfind('}')
             
-            if match:
-                json_str = match.group()
-                data = json.loads(json_str)
-                return data
+            if start != -1 and end > start:
+                return json_compat.loads(response_text[start:end + 1]), True
             else:
                 # If no JSON found, create a simple response
                 return {
@@ -188,67 +627,59 @@ Response:"""
                     ],
                     'quick_wins': ['Check meta tags', 'Review content'],
                     'long_term_strategies': ['Regular SEO audits', 'Content optimization']
-                }
+                }, False
                 
-        except json.JSONDecodeError:
+        except json_compat.JSONDecodeError:
             print("Could not parse JSON response")
-            return self._generate_fallback_recommendations({})
+            return self._generate_fallback_recommendations({}), False
         except Exception as e:
             print(f"Error parsing response: {e}")
-            return self._generate_fallback_recommendations({})
+            return self._generate_fallback_recommendations({}), False
+    
+    def _parse_batch_response(self, response_text: str, count: int) -> List[Optional[Dict]]:
+        """Parse a JSON array reply into per-site recommendations, None where missing"""
+        # Whichever bracket comes first tells an array reply from a lone object
+        starts = [i for i in (response_text.find('['), response_text.find('{')) if i != -1]
+        start = min(starts) if starts else -1
+        closer = ']' if start != -1 and response_text[start] == '[' else '}'
+        end = response_text.rfind(closer)
+        
+        data = None
+        if start != -1 and end > start:
+            try:
+                data = json_compat.loads(response_text[start:end + 1])
+            except json_compat.JSONDecodeError:
+                print("Could not parse batch JSON response")
+        
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list):
+            return [None] * count
+        
+        results = [item if isinstance(item, dict) else None for item in data[:count]]
+        return results + [None] * (count - len(results))
     
     def _generate_fallback_recommendations(self, seo_analysis: Dict) -> Dict:
         """Generate fallback recommendations when AI is not available"""
         
         # Extract issues for recommendations
-        issues = []
-        for category, data in seo_analysis.items():
-            if isinstance(data, dict) and 'issues' in data:
-                issues.extend(data['issues'][:3])  # Take first 3 issues
-        
-        # Create recommendations based on issues
-        recommendations = []
-        if issues:
-            for i, issue in enumerate(issues[:5]):
-                priority = 'high' if i < 2 else 'medium' if i < 4 else 'low'
-                recommendations.append({
-                    'title': f'Address Issue {i+1}',
-                    'description': issue,
-                    'priority': priority
-                })
-        else:
-            # Default recommendations if no issues
-            recommendations = [
-                {
-                    'title': 'Optimize Title Tag',
-                    'description': 'Ensure title is 50-60 characters with primary keyword',
-                    'priority': 'high'
-                },
-                {
-                    'title': 'Improve Meta Description',
-                    'description': 'Write compelling meta description of 120-160 characters',
-                    'priority': 'high'
-                },
-                {
-                    'title': 'Enhance Content',
-                    'description': 'Aim for at least 300 words of quality, relevant content',
-                    'priority': 'medium'
-                }
-            ]
+        issues = [
+            issue
+            for data in seo_analysis.values() if isinstance(data, dict)
+            for issue in data.get('issues', ())[:3]  # Take first 3 issues
+        ]
+        
+        summary, recommendations, quick_wins, long_term_strategies = _fallback_for(tuple(issues[:5]))
         
+        # Rebuild the mutable containers so callers never touch the cached tuples
         return {
-            'summary': 'Based on technical SEO analysis, here are the key recommendations for improvement.',
-            'recommendations': recommendations,
-            'quick_wins': [
-                'Fix meta tags if needed',
-                'Add alt text to images without it',
-                'Ensure fast page loading'
+            'summary': summary,
+            'recommendations': [
+                {'title': title, 'description': description, 'priority': priority}
+                for title, description, priority in recommendations
             ],
-            'long_term_strategies': [
-                'Regular content updates and optimization',
-                'Build quality backlinks',
-                'Monitor SEO performance regularly'
-            ]
+            'quick_wins': list(quick_wins),
+            'long_term_strategies': list(long_term_strategies)
         }
     
     def clear_history(self):
@@ -1,9 +1,12 @@
 import streamlit as st
-import pandas as pd
-from utils.web_scraper import WebScraper
+from utils.web_scraper import get_scraper
 from utils.seo_analyzer import SEOAnalyzer
 from agents.seo_agent import SEOAgent
+from utils import json_compat
+from config import OLLAMA_KEEP_ALIVE, OLLAMA_NUM_PARALLEL
+import html
 import time
+from itertools import chain, islice
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -63,6 +66,10 @@ st.markdown("""
 # Initialize session state
 if 'seo_agent' not in st.session_state:
     st.session_state.seo_agent = SEOAgent()
+if 'scraper' not in st.session_state:
+    st.session_state.scraper = get_scraper()
+if 'analyzer' not in st.session_state:
+    st.session_state.analyzer = SEOAnalyzer()
 if 'page_data' not in st.session_state:
     st.session_state.page_data = None
 if 'seo_analysis' not in st.session_state:
@@ -71,27 +78,46 @@ if 'recommendations' not in st.session_state:
     st.session_state.recommendations = None
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'report' not in st.session_state:
+    st.session_state.report = None
 if 'analysis_complete' not in st.session_state:
     st.session_state.analysis_complete = False
 
-def analyze_website(url):
+@st.cache_data(ttl=5, show_spinner=False)
+def list_models(base_url, _agent):
+    """Available Ollama models at base_url, shared across reruns for a few seconds"""
+    return _agent.get_available_models()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def scrape_and_analyze(url, _scraper, _analyzer, _refresh=False):
+    """Fetch and analyze a website, cached so re-submitting a URL skips the re-scrape"""
+    # Fetch website data (underscore args are left out of the cache key)
+    page_data, error = _scraper.fetch_url(url, refresh=_refresh)
+    
+    if error:
+        # Raised rather than returned so failed fetches are not cached
+        raise RuntimeError(error)
+    
+    # Perform SEO analysis
+    seo_analysis = _analyzer.analyze_page(page_data)
+    
+    return page_data, seo_analysis
+
+def analyze_website(url, force_refresh=False):
     """Perform SEO analysis on a website"""
     with st.spinner("Analyzing website..."):
-        # Initialize components
-        scraper = WebScraper()
-        analyzer = SEOAnalyzer()
-        
-        # Fetch website data
-        page_data, error = scraper.fetch_url(url)
+        if force_refresh:
+            scrape_and_analyze.clear(url)
         
-        if error:
-            st.error(f"Error: {error}")
+        try:
+            page_data, seo_analysis = scrape_and_analyze(
+                url, st.session_state.scraper, st.session_state.analyzer, _refresh=force_refresh
+            )
+        except RuntimeError as e:
+            st.error(f"Error: {e}")
             return None, None, None
         
-        # Perform SEO analysis
-        seo_analysis = analyzer.analyze_page(page_data)
-        
-        # Get AI recommendations
+        # Get AI recommendations (cached separately by the agent, keyed on the model)
         agent = st.session_state.seo_agent
         recommendations = agent.analyze_and_advise(page_data, seo_analysis)
         
@@ -112,6 +138,20 @@ def display_seo_score(score):
     </div>
     """, unsafe_allow_html=True)
 
+_CARD_TMPL = '<div class="recommendation-card {cls}"><h4>{n}. {title}</h4><p>{desc}</p></div>'
+
+def render_recommendation_cards(recs, css_class):
+    """Build the HTML for a list of recommendation cards"""
+    return "".join(
+        _CARD_TMPL.format(
+            cls=css_class,
+            n=i + 1,
+            title=html.escape(str(rec.get('title', 'Recommendation'))),
+            desc=html.escape(str(rec.get('description', '')))
+        )
+        for i, rec in enumerate(recs)
+    )
+
 def display_recommendations(recommendations):
     """Display SEO recommendations"""
     if not recommendations:
@@ -131,39 +171,17 @@ def display_recommendations(recommendations):
         # Create tabs for different priorities
         tab1, tab2, tab3 = st.tabs(["🔴 High Priority", "🟡 Medium Priority", "🟢 Low Priority"])
         
-        high_priority = [r for r in recommendations['recommendations'] if r.get('priority', '').lower() == 'high']
-        medium_priority = [r for r in recommendations['recommendations'] if r.get('priority', '').lower() == 'medium']
-        low_priority = [r for r in recommendations['recommendations'] if r.get('priority', '').lower() == 'low']
-        
-        with tab1:
-            for i, rec in enumerate(high_priority):
-                with st.container():
-                    st.markdown(f"""
-                    <div class="recommendation-card high-priority">
-                        <h4>{i+1}. {rec.get('title', 'Recommendation')}</h4>
-                        <p>{rec.get('description', '')}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        with tab2:
-            for i, rec in enumerate(medium_priority):
-                with st.container():
-                    st.markdown(f"""
-                    <div class="recommendation-card medium-priority">
-                        <h4>{i+1}. {rec.get('title', 'Recommendation')}</h4>
-                        <p>{rec.get('description', '')}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        with tab3:
-            for i, rec in enumerate(low_priority):
-                with st.container():
-                    st.markdown(f"""
-                    <div class="recommendation-card low-priority">
-                        <h4>{i+1}. {rec.get('title', 'Recommendation')}</h4>
-                        <p>{rec.get('description', '')}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+        # Bucket by priority in one pass; unknown priorities are shown as medium
+        buckets = {'high': [], 'medium': [], 'low': []}
+        for rec in recommendations['recommendations']:
+            priority = str(rec.get('priority') or 'medium').lower()
+            buckets.get(priority, buckets['medium']).append(rec)
+        
+        # One markdown call per tab instead of one per card
+        for tab, priority in ((tab1, 'high'), (tab2, 'medium'), (tab3, 'low')):
+            with tab:
+                st.markdown(render_recommendation_cards(buckets[priority], f"{priority}-priority"),
+                            unsafe_allow_html=True)
     
     # Display quick wins
     if 'quick_wins' in recommendations and recommendations['quick_wins']:
@@ -269,17 +287,17 @@ def chat_interface():
             'main_issues': []
         }
         
-        # Extract main issues from analysis
+        # Extract main issues from analysis (first 2 per category, 20 at most)
         if st.session_state.seo_analysis:
-            for category, data in st.session_state.seo_analysis.items():
-                if isinstance(data, dict) and 'issues' in data and data['issues']:
-                    context['main_issues'].extend(data['issues'][:2])
+            context['main_issues'] = list(islice(chain.from_iterable(
+                islice(data['issues'], 2)
+                for data in st.session_state.seo_analysis.values()
+                if isinstance(data, dict) and data.get('issues')
+            ), 20))
         
         # Get agent response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = st.session_state.seo_agent.chat(prompt, context)
-                st.markdown(response)
+            response = st.write_stream(st.session_state.seo_agent.chat_stream(prompt, context))
         
         # Add assistant response to chat history
         st.session_state.chat_history.append({"role": "assistant", "content": response})
@@ -303,7 +321,7 @@ def main():
         try:
             # Get available models
             agent = st.session_state.seo_agent
-            available_models = agent.get_available_models()
+            available_models = list_models(agent.base_url, agent)
             
             if available_models:
                 default_model = available_models[0]
@@ -320,10 +338,21 @@ def main():
             st.error(f"Error loading models: {e}")
             model = DEFAULT_MODEL
 
+        with st.expander("Ollama server tuning"):
+            st.markdown(f"""
+- `OLLAMA_KEEP_ALIVE` = `{OLLAMA_KEEP_ALIVE}`: how long the model stays loaded between requests
+- `OLLAMA_NUM_PARALLEL` = `{OLLAMA_NUM_PARALLEL}`: concurrent requests; set the same value on the server
+
+Start the server with e.g. `OLLAMA_NUM_PARALLEL={OLLAMA_NUM_PARALLEL} OLLAMA_MAX_LOADED_MODELS=2 ollama serve`.
+""")
+
         if model != st.session_state.seo_agent.model:
+            st.session_state.seo_agent.close()
             st.session_state.seo_agent = SEOAgent(model)
 
         
+        force_refresh = st.checkbox("Force refresh", help="Re-fetch the page instead of reusing a cached analysis")
+        
         # Analysis button
         analyze_btn = st.button("Analyze Website", type="primary", use_container_width=True)
         
@@ -332,13 +361,20 @@ def main():
                 url = 'https://' + url
             
             # Perform analysis
-            page_data, seo_analysis, recommendations = analyze_website(url)
+            page_data, seo_analysis, recommendations = analyze_website(url, force_refresh)
             
             if page_data:
                 st.session_state.page_data = page_data
                 st.session_state.seo_analysis = seo_analysis
                 st.session_state.recommendations = recommendations
                 st.session_state.analysis_complete = True
+                st.session_state.report = {
+                    'url': page_data.get('url', ''),
+                    'timestamp': datetime.now().isoformat(),
+                    'seo_score': seo_analysis.get('score', 0),
+                    'analysis': seo_analysis,
+                    'recommendations': recommendations
+                }
                 st.session_state.chat_history = []  # Clear chat history
                 st.session_state.seo_agent.clear_history()  # Clear agent history
                 
@@ -351,33 +387,22 @@ def main():
         st.header("📊 Export")
         
         if st.session_state.analysis_complete:
-            if st.button("📥 Export Report", use_container_width=True):
-                # Create report data
-                report = {
-                    'url': st.session_state.page_data.get('url', ''),
-                    'timestamp': datetime.now().isoformat(),
-                    'seo_score': st.session_state.seo_analysis.get('score', 0),
-                    'analysis': st.session_state.seo_analysis,
-                    'recommendations': st.session_state.recommendations
-                }
-                
-                # Convert to JSON for download
-                import json
-                report_json = json.dumps(report, indent=2)
-                
-                st.download_button(
-                    label="Download JSON Report",
-                    data=report_json,
-                    file_name=f"seo_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
+            report = st.session_state.report
+            
+            # Serialized only when the user actually clicks download
+            st.download_button(
+                label="📥 Download JSON Report",
+                data=lambda: json_compat.dumps(report, indent=True),
+                file_name=f"seo_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
         
         st.divider()
         
         # Clear button
         if st.button("🗑️ Clear Analysis", use_container_width=True):
-            for key in ['page_data', 'seo_analysis', 'recommendations', 'chat_history', 'analysis_complete']:
+            for key in ['page_data', 'seo_analysis', 'recommendations', 'report', 'chat_history', 'analysis_complete']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.session_state.seo_agent.clear_history()
@@ -6,12 +6,23 @@ load_dotenv()
 # Ollama Configuration
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gemma3:latest")
+# How long Ollama keeps the model loaded after a request (avoids cold reloads)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Should match the server's OLLAMA_NUM_PARALLEL; bounds concurrent generate calls
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+# Context window sent with every request; kept constant since changing it reloads the model
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
 
 # SEO Analysis Settings
 MAX_CONTENT_LENGTH = 10000
+# Pages are read up to this many bytes; markup makes raw HTML far larger than its text
+MAX_HTML_BYTES = 2 * 1024 * 1024
 REQUEST_TIMEOUT = 30
 USER_AGENT = "SEO-Analyzer-Bot/1.0"
 
 # Agent Settings
 AGENT_TEMPERATURE = 0.1
-MAX_TOKENS = 4000
\ No newline at end of file
+MAX_TOKENS = 4000
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", ".seo_cache")
+# Seconds a model reply stays in the disk cache before it is generated again
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
\ No newline at end of file
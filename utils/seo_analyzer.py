@@ -1,37 +1,276 @@
+import functools
 import re
+from collections import Counter
 from typing import Dict, List, Tuple
 import math
 
+# Keywords tracked for density, matched as whole words in a single scan
+_KEYWORDS = ('seo', 'website', 'page', 'content', 'digital', 'marketing')
+# Matched against the lower-cased content, so no IGNORECASE needed
+_KEYWORD_RE = re.compile(r'\b(' + '|'.join(_KEYWORDS) + r')\b')
+# Bytes version for ASCII pages
+_KEYWORD_BYTES = tuple(word.encode('ascii') for word in _KEYWORDS)
+_KEYWORD_BYTES_RE = re.compile(rb'\b(' + b'|'.join(_KEYWORD_BYTES) + rb')\b')
+
+# Analysis sections whose issues count against the score
+_SCORED_CATEGORIES = ('title_analysis', 'meta_description_analysis', 'content_analysis',
+                      'header_analysis', 'image_analysis', 'link_analysis', 'technical_seo')
+
+# Optional JIT for the text scan; the compile only pays off on longer pages
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
+_JIT_SCAN_MIN_LENGTH = 4096
+
+if numba is not None:
+    # Keywords as zero-padded byte rows for the compiled scan
+    _KEYWORD_LENGTHS = np.array([len(word) for word in _KEYWORD_BYTES], dtype=np.int64)
+    _KEYWORD_TABLE = np.array(
+        [list(word.ljust(_KEYWORD_LENGTHS.max(), b'\0')) for word in _KEYWORD_BYTES], dtype=np.uint8
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _title_issues(title: str) -> Tuple[str, ...]:
+    """Title issues, cached since templated pages share titles"""
+    length = len(title)
+    issues = []
+    
+    if length < 50:
+        issues.append(f"Title too short ({length} chars). Aim for 50-60 characters.")
+    elif length > 60:
+        issues.append(f"Title too long ({length} chars). Aim for 50-60 characters.")
+    
+    if not title:
+        issues.append("Missing title tag")
+    
+    return tuple(issues)
+
+
+@functools.lru_cache(maxsize=4096)
+def _description_issues(description: str) -> Tuple[str, ...]:
+    """Meta description issues, cached like _title_issues"""
+    length = len(description)
+    issues = []
+    
+    if length < 120:
+        issues.append(f"Description too short ({length} chars). Aim for 120-160 characters.")
+    elif length > 160:
+        issues.append(f"Description too long ({length} chars). Aim for 120-160 characters.")
+    
+    if not description or description == "No meta description":
+        issues.append("Missing meta description")
+    
+    return tuple(issues)
+
+def _count_sentences(content: str) -> int:
+    """Number of sentences (at least 1), from terminators rather than splitting"""
+    # "..." is one terminator, not three
+    periods = content.count('.') - 2 * content.count('...')
+    return periods + content.count('!') + content.count('?') or 1
+
+
+def _scan_ascii(buf, keywords, keyword_lengths):
+    """One pass over lower-cased ASCII bytes: (split() word count, terminator count, keyword counts)"""
+    words = 0
+    terminators = 0
+    dot_run = 0
+    counts = np.zeros(keywords.shape[0], np.int64)
+    in_word = False
+    token_start = -1
+    
+    n = buf.shape[0]
+    for i in range(n + 1):
+        c = 32  # a trailing space flushes the last word, token and run of dots
+        if i < n:
+            c = buf[i]
+        
+        # Words as str.split() sees them: runs of anything but ASCII whitespace
+        is_space = c == 32 or 9 <= c <= 13 or 28 <= c <= 31
+        if not is_space and not in_word:
+            words += 1
+        in_word = not is_space
+        
+        # Terminators as _count_sentences counts them ("..." is one)
+        if c == 46:
+            dot_run += 1
+        else:
+            if dot_run:
+                terminators += dot_run - 2 * (dot_run // 3)
+                dot_run = 0
+            if c == 33 or c == 63:
+                terminators += 1
+        
+        # \bkeyword\b matches exactly when a whole run of word characters equals the keyword
+        if 97 <= c <= 122 or 48 <= c <= 57 or c == 95:
+            if token_start < 0:
+                token_start = i
+        elif token_start >= 0:
+            length = i - token_start
+            for k in range(keywords.shape[0]):
+                if keyword_lengths[k] != length:
+                    continue
+                matched = True
+                for j in range(length):
+                    if buf[token_start + j] != keywords[k, j]:
+                        matched = False
+                        break
+                if matched:
+                    counts[k] += 1
+                    break
+            token_start = -1
+    
+    return words, terminators, counts
+
+
+def _text_stats(content: str, content_lower: str) -> Tuple[int, int, Tuple[int, ...]]:
+    """Word count, sentence count and per-keyword counts (in _KEYWORDS order) of the page text"""
+    if _jit_scan is not None and len(content) > _JIT_SCAN_MIN_LENGTH and content.isascii():
+        # Long ASCII text: one compiled pass instead of separate split/count/regex scans
+        buf = np.frombuffer(content_lower.encode('ascii'), dtype=np.uint8)
+        words, terminators, counts = _jit_scan(buf, _KEYWORD_TABLE, _KEYWORD_LENGTHS)
+        return int(words), int(terminators) or 1, tuple(counts.tolist())
+    
+    if content_lower.isascii():
+        counts = Counter(_KEYWORD_BYTES_RE.findall(content_lower.encode('ascii')))
+        keys = _KEYWORD_BYTES
+    else:
+        counts = Counter(_KEYWORD_RE.findall(content_lower))
+        keys = _KEYWORDS
+    return len(content.split()), _count_sentences(content), tuple(counts[key] for key in keys)
+
+
+def _count_alt_texts(images) -> int:
+    """Number of images with a non-blank alt attribute"""
+    return sum(1 for img in images if img.alt and not img.alt.isspace())
+
+
+_jit_scan = numba.njit(cache=True)(_scan_ascii) if numba is not None else None
+
+
 class SEOAnalyzer:
+    # Stateless, so instances don't need a __dict__
+    __slots__ = ()
+    
     def __init__(self):
         pass
     
     def analyze_page(self, page_data: Dict) -> Dict:
         """Comprehensive SEO analysis"""
+        get = page_data.get
+        content = get('content', '')
+        # Lower-case and count once for all the checks that need them
+        content_lower = content.lower()
+        word_count, sentence_count, keyword_counts = _text_stats(content, content_lower)
+        
         analysis = {
-            'basic_metrics': self._get_basic_metrics(page_data),
-            'title_analysis': self._analyze_title(page_data.get('title', '')),
-            'meta_description_analysis': self._analyze_meta_description(page_data.get('meta_description', '')),
-            'content_analysis': self._analyze_content(page_data.get('content', '')),
-            'header_analysis': self._analyze_headers(page_data.get('headers', {})),
-            'image_analysis': self._analyze_images(page_data.get('images', [])),
-            'link_analysis': self._analyze_links(page_data.get('links', [])),
+            'basic_metrics': self._get_basic_metrics(page_data, word_count),
+            'title_analysis': self._analyze_title(get('title', '')),
+            'meta_description_analysis': self._analyze_meta_description(get('meta_description', '')),
+            'content_analysis': self._analyze_content(word_count, sentence_count, keyword_counts),
+            'header_analysis': self._analyze_headers(get('headers', {})),
+            'image_analysis': self._analyze_images(get('images', ())),
+            'link_analysis': self._analyze_links(get('links', ())),
             'technical_seo': self._analyze_technical(page_data),
             'score': 0
         }
         
         # Calculate overall score
-        analysis['score'] = self._calculate_seo_score(analysis)
+        total_issues = sum(len(analysis[category].get('issues') or ()) for category in _SCORED_CATEGORIES)
+        analysis['score'] = self._calculate_seo_score(
+            total_issues,
+            analysis['content_analysis']['word_count'],
+            analysis['image_analysis'].get('alt_percentage', 0)
+        )
         
         return analysis
     
-    def _get_basic_metrics(self, page_data):
-        content = page_data.get('content', '')
+    def analyze_pages(self, pages: List[Dict]):
+        """Score many pages at once, returning a pandas DataFrame with one row per page.
+        
+        Scores match analyze_page; for a page's issue messages, run analyze_page on it.
+        """
+        # Only bulk scoring needs these, so the single-page path doesn't import them
+        import numpy as np
+        import pandas as pd
+        
+        count = len(pages)
+        
+        def column(values, dtype=np.int64):
+            return np.fromiter(values, dtype=dtype, count=count)
+        
+        # The per-page string and list measurements, gathered into arrays
+        contents = [page.get('content', '') for page in pages]
+        headers = [page.get('headers', {}) for page in pages]
+        images = [page.get('images', ()) for page in pages]
+        links = [page.get('links', ()) for page in pages]
+        descriptions = [page.get('meta_description', '') for page in pages]
+        
+        word_count = column(len(content.split()) for content in contents)
+        sentence_count = column(_count_sentences(content) for content in contents)
+        title_length = column(len(page.get('title', '')) for page in pages)
+        description_length = column(len(description) for description in descriptions)
+        missing_description = column(
+            (not description or description == "No meta description" for description in descriptions), bool
+        )
+        h1_count = column(len(h.get('h1', ())) for h in headers)
+        has_lower_headers = column((any(h.get(f'h{level}') for level in range(2, 7)) for h in headers), bool)
+        image_count = column(len(page_images) for page_images in images)
+        images_with_alt = column(_count_alt_texts(page_images) for page_images in images)
+        link_count = column(len(page_links) for page_links in links)
+        internal_links = column(sum(link.is_internal for link in page_links) for page_links in links)
+        empty_link_texts = column(sum(1 for link in page_links if not link.text) for page_links in links)
+        response_time = column((page.get('response_time', 0) for page in pages), np.float64)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_sentence_length = word_count / sentence_count
+            alt_percentage = np.where(image_count > 0, images_with_alt / image_count * 100, 0.0)
+            internal_percentage = np.where(link_count > 0, internal_links / link_count * 100, 0.0)
+        
+        # The same checks as the _analyze_* methods, one boolean array each
+        issue_count = np.sum([
+            (title_length < 50) | (title_length > 60),
+            title_length == 0,
+            (description_length < 120) | (description_length > 160),
+            missing_description,
+            word_count < 300,
+            avg_sentence_length > 25,
+            h1_count != 1,
+            (h1_count == 0) & has_lower_headers,
+            (image_count > 0) & (alt_percentage < 90),
+            empty_link_texts > 0,
+            (link_count > 0) & (internal_percentage < 20),
+            response_time > 3
+        ], axis=0, dtype=np.int64)
+        
+        # Deduct 2 points per issue, with the content and alt text bonuses (alt % rounded as in analyze_page)
+        score = 100 - issue_count * 2 + 5 * (word_count >= 300) + 5 * (np.round(alt_percentage, 1) >= 90)
+        
+        return pd.DataFrame({
+            'url': [page.get('url', '') for page in pages],
+            'score': np.clip(score, 0, 100),
+            'issue_count': issue_count,
+            'word_count': word_count,
+            'avg_sentence_length': avg_sentence_length.round(1),
+            'title_length': title_length,
+            'description_length': description_length,
+            'h1_count': h1_count,
+            'image_count': image_count,
+            'alt_percentage': alt_percentage.round(1),
+            'link_count': link_count,
+            'internal_links': internal_links,
+            'response_time': response_time
+        })
+    
+    def _get_basic_metrics(self, page_data, word_count):
         title = page_data.get('title', '')
         description = page_data.get('meta_description', '')
         
         return {
-            'word_count': len(content.split()),
+            'word_count': word_count,
             'title_length': len(title),
             'description_length': len(description),
             'image_count': len(page_data.get('images', [])),
@@ -41,57 +280,31 @@ class SEOAnalyzer:
     
     def _analyze_title(self, title):
         length = len(title)
-        analysis = {
+        return {
             'current': title,
             'length': length,
             'optimal': 50 <= length <= 60,
-            'issues': []
+            # Fresh list so callers can't modify the cached issues
+            'issues': list(_title_issues(title))
         }
-        
-        if length < 50:
-            analysis['issues'].append(f"Title too short ({length} chars). Aim for 50-60 characters.")
-        elif length > 60:
-            analysis['issues'].append(f"Title too long ({length} chars). Aim for 50-60 characters.")
-        
-        if not title:
-            analysis['issues'].append("Missing title tag")
-        
-        return analysis
     
     def _analyze_meta_description(self, description):
         length = len(description)
-        analysis = {
+        return {
             'current': description,
             'length': length,
             'optimal': 120 <= length <= 160,
-            'issues': []
+            'issues': list(_description_issues(description))
         }
-        
-        if length < 120:
-            analysis['issues'].append(f"Description too short ({length} chars). Aim for 120-160 characters.")
-        elif length > 160:
-            analysis['issues'].append(f"Description too long ({length} chars). Aim for 120-160 characters.")
-        
-        if not description or description == "No meta description":
-            analysis['issues'].append("Missing meta description")
-        
-        return analysis
     
-    def _analyze_content(self, content):
-        words = content.split()
-        word_count = len(words)
-        
+    def _analyze_content(self, word_count, sentence_count, keyword_counts):
         # Calculate readability (simple Flesch-like score)
-        sentences = re.split(r'[.!?]+', content)
-        avg_sentence_length = word_count / max(len(sentences), 1)
+        avg_sentence_length = word_count / sentence_count
         
         # Keyword density (simple version)
-        text_lower = content.lower()
-        common_words = ['seo', 'website', 'page', 'content', 'digital', 'marketing']
         keyword_density = {}
         
-        for word in common_words:
-            count = text_lower.count(word)
+        for word, count in zip(_KEYWORDS, keyword_counts):
             if count > 0:
                 density = (count / word_count) * 100
                 keyword_density[word] = round(density, 2)
@@ -117,27 +330,31 @@ class SEOAnalyzer:
             'issues': []
         }
         
+        # Count all headers, noting whether any H2+ exist for the hierarchy check
+        structure = analysis['structure']
+        has_lower_headers = False
+        for level in range(1, 7):
+            count = len(headers.get(f'h{level}', ()))
+            structure[f'h{level}'] = count
+            if level > 1 and count:
+                has_lower_headers = True
+        
         # Check for H1
-        h1_count = len(headers.get('h1', []))
+        h1_count = structure['h1']
         if h1_count == 0:
             analysis['issues'].append("Missing H1 tag")
         elif h1_count > 1:
             analysis['issues'].append(f"Multiple H1 tags found ({h1_count})")
         
-        # Count all headers
-        for level in range(1, 7):
-            count = len(headers.get(f'h{level}', []))
-            analysis['structure'][f'h{level}'] = count
-        
         # Check header hierarchy
-        if h1_count == 0 and any(len(headers.get(f'h{i}', [])) > 0 for i in range(2, 7)):
+        if h1_count == 0 and has_lower_headers:
             analysis['issues'].append("Header hierarchy issue: Using H2+ without H1")
         
         return analysis
     
     def _analyze_images(self, images):
         total_images = len(images)
-        images_with_alt = sum(1 for img in images if img.get('has_alt', False))
+        images_with_alt = _count_alt_texts(images)
         alt_percentage = (images_with_alt / total_images * 100) if total_images > 0 else 0
         
         analysis = {
@@ -154,12 +371,12 @@ class SEOAnalyzer:
     
     def _analyze_links(self, links):
         total_links = len(links)
-        internal_links = sum(1 for link in links if link.get('is_internal', False))
+        internal_links = sum(link.is_internal for link in links)
         external_links = total_links - internal_links
         
         broken_links = []  # Would need actual checking
-        link_texts = [link.get('text', '') for link in links]
-        empty_link_texts = sum(1 for text in link_texts if not text.strip())
+        # Link texts are stripped by the scraper
+        empty_link_texts = sum(1 for link in links if not link.text)
         
         analysis = {
             'total_links': total_links,
@@ -191,22 +408,16 @@ class SEOAnalyzer:
             'issues': issues
         }
     
-    def _calculate_seo_score(self, analysis):
-        score = 100
-        
-        # Deduct points for issues
-        for category in ['title_analysis', 'meta_description_analysis', 'content_analysis', 
-                        'header_analysis', 'image_analysis', 'link_analysis', 'technical_seo']:
-            if category in analysis:
-                issues = analysis[category].get('issues', [])
-                score -= len(issues) * 2  # Deduct 2 points per issue
+    def _calculate_seo_score(self, total_issues, word_count, alt_percentage):
+        # Deduct 2 points per issue
+        score = 100 - total_issues * 2
         
         # Content quality bonus
-        if analysis['content_analysis']['word_count'] >= 300:
+        if word_count >= 300:
             score += 5
         
         # Image alt text bonus
-        if analysis['image_analysis'].get('alt_percentage', 0) >= 90:
+        if alt_percentage >= 90:
             score += 5
         
         return max(0, min(100, round(score)))
\ No newline at end of file
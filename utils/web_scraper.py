@@ -1,101 +1,344 @@
+import asyncio
+import re
+import threading
+from collections import OrderedDict
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from lxml import etree
+from lxml import html as lxml_html
+from urllib.parse import urljoin, urlsplit
 import time
-from config import USER_AGENT, REQUEST_TIMEOUT, MAX_CONTENT_LENGTH
+from typing import NamedTuple
+from config import USER_AGENT, REQUEST_TIMEOUT, MAX_CONTENT_LENGTH, MAX_HTML_BYTES
+
+# <meta charset=...> / http-equiv declarations that lxml will honour on its own
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=', re.IGNORECASE)
+
+# Sections left out of the page text, links and images (headers inside them still count)
+_PRUNED_TAGS = frozenset(("script", "style", "nav", "footer", "header"))
+_HEADER_TAGS = frozenset(f'h{i}' for i in range(1, 7))
+
+# Concurrent page downloads per AsyncWebScraper.fetch_many call
+_FETCH_CONCURRENCY = 20
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+# Parsed pages kept per URL with their ETag/Last-Modified, so a 304 skips download and parse
+_PARSED_CACHE_SIZE = 256
+
+
+# lxml parsers can't be shared between threads, so each thread keeps its own per encoding
+_parsers = threading.local()
+
+_default_scraper = None
+
+
+class LinkRec(NamedTuple):
+    """An <a href> on the page, with its URL resolved against the page URL"""
+    text: str
+    url: str
+    is_internal: bool
+
+
+class ImageRec(NamedTuple):
+    """An <img src> on the page"""
+    src: str
+    alt: str
+
 
 class WebScraper:
     def __init__(self):
         self.session = requests.Session()
+        
+        # Keep connections to many hosts alive across fetches
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=64)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         self.session.headers.update({
-            'User-Agent': USER_AGENT
+            'User-Agent': USER_AGENT,
+            # gzip/deflate, plus br and zstd when their decoders are installed
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding']
         })
+        
+        self._parsed = OrderedDict()
+        self._parsed_lock = threading.Lock()
     
-    def fetch_url(self, url):
-        """Fetch and parse a URL"""
+    def fetch_url(self, url, refresh=False):
+        """Fetch and parse a URL, `refresh` ignores the parse kept from an earlier fetch"""
         try:
-            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            
-            # Check content type
-            content_type = response.headers.get('content-type', '').lower()
-            if 'text/html' not in content_type:
-                return None, "URL does not return HTML content"
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Revalidate an earlier fetch with a conditional GET
+            cached = None if refresh else self._get_parsed(url)
+            headers = {}
+            if cached is not None:
+                etag, last_modified, _ = cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
             
-            # Extract key information
-            data = {
-                'url': url,
-                'title': self._get_title(soup),
-                'meta_description': self._get_meta_description(soup),
-                'meta_keywords': self._get_meta_keywords(soup),
-                'headers': self._get_headers(soup),
-                'content': self._get_main_content(soup)[:MAX_CONTENT_LENGTH],
-                'links': self._get_links(soup, url),
-                'images': self._get_images(soup),
-                'status_code': response.status_code,
-                'response_time': response.elapsed.total_seconds()
-            }
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT, stream=True, headers=headers)
+            with response:
+                if response.status_code == 304 and cached is not None:
+                    data = _copy_page(cached[2])
+                    data['response_time'] = response.elapsed.total_seconds()
+                    return data, None
+                
+                response.raise_for_status()
+                
+                # Check content type before downloading the body
+                content_type = response.headers.get('content-type', '').lower()
+                if 'text/html' not in content_type:
+                    return None, "URL does not return HTML content"
+                
+                content = self._read_body(response)
             
-            return data, None
+            data, error = self._parse_page(url, content, content_type, response.status_code,
+                                           response.elapsed.total_seconds())
+            etag = response.headers.get('etag')
+            last_modified = response.headers.get('last-modified')
+            if data is not None and (etag or last_modified):
+                self._set_parsed(url, (etag, last_modified, _copy_page(data)))
+            return data, error
             
         except requests.exceptions.RequestException as e:
             return None, f"Error fetching URL: {str(e)}"
     
-    def _get_title(self, soup):
-        title_tag = soup.find('title')
-        return title_tag.text.strip() if title_tag else "No title found"
-    
-    def _get_meta_description(self, soup):
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        return meta_desc['content'].strip() if meta_desc else "No meta description"
-    
-    def _get_meta_keywords(self, soup):
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        return meta_keywords['content'].strip() if meta_keywords else "No meta keywords"
-    
-    def _get_headers(self, soup):
-        headers = {}
-        for i in range(1, 7):
-            h_tags = soup.find_all(f'h{i}')
-            headers[f'h{i}'] = [h.text.strip() for h in h_tags]
-        return headers
-    
-    def _get_main_content(self, soup):
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
+    def _get_parsed(self, url):
+        """(etag, last_modified, data) from the last fetch of url, None if not kept"""
+        with self._parsed_lock:
+            entry = self._parsed.get(url)
+            if entry is not None:
+                self._parsed.move_to_end(url)
+            return entry
+    
+    def _set_parsed(self, url, entry):
+        with self._parsed_lock:
+            self._parsed[url] = entry
+            self._parsed.move_to_end(url)
+            if len(self._parsed) > _PARSED_CACHE_SIZE:
+                self._parsed.popitem(last=False)
+    
+    def _read_body(self, response):
+        """Read the body up to MAX_HTML_BYTES, leaving the rest of a huge page unread"""
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_HTML_BYTES:
+                break
+        return b''.join(chunks)[:MAX_HTML_BYTES]
+    
+    def _parse_page(self, url, content, content_type, status_code, response_time):
+        """Parse a downloaded HTML body into page data"""
+        try:
+            parser = _html_parser(self._get_encoding(content, content_type))
+        except LookupError:
+            # Unknown charset from the server, detect the encoding as if none were declared
+            parser = _html_parser(self._get_encoding(content, ''))
         
-        # Get text from main, article, or body
-        main_content = soup.find('main') or soup.find('article') or soup.find('body')
-        return main_content.get_text(separator=' ', strip=True) if main_content else ""
+        try:
+            root = lxml_html.document_fromstring(content, parser=parser)
+        except etree.ParserError:
+            # "Document is empty": blank, or only a doctype or comments; a page with nothing on it
+            root = lxml_html.document_fromstring(b'<html></html>', parser=parser)
+        except ValueError as e:
+            return None, f"Error parsing HTML: {str(e)}"
+        
+        # Walk the body once for headers, text, links and images
+        headers, text, links, images = self._extract_all(root, url)
+        
+        # Extract key information
+        data = {
+            'url': url,
+            'title': self._get_title(root),
+            'meta_description': self._get_meta_description(root),
+            'meta_keywords': self._get_meta_keywords(root),
+            'headers': headers,
+            'content': text[:MAX_CONTENT_LENGTH],
+            'links': links,
+            'images': images,
+            'status_code': status_code,
+            'response_time': response_time
+        }
+        
+        return data, None
     
-    def _get_links(self, soup, base_url):
+    def _get_encoding(self, content, content_type):
+        """Encoding for lxml: the HTTP charset, else UTF-8 when the page doesn't declare one"""
+        if 'charset=' in content_type:
+            charset = content_type.split('charset=', 1)[1].split(';', 1)[0].strip(' "\'')
+            # An empty "charset=" declares nothing, so detect it like a missing one
+            if charset:
+                return charset
+        if _META_CHARSET_RE.search(content, 0, 4096):
+            return None
+        try:
+            content.decode('utf-8')
+            return 'utf-8'
+        except UnicodeDecodeError as e:
+            # A body cut off at MAX_HTML_BYTES may end partway through a character
+            return 'utf-8' if e.reason == 'unexpected end of data' else None
+    
+    def _get_title(self, root):
+        title_tag = root.find('.//title')
+        return title_tag.text_content().strip() if title_tag is not None else "No title found"
+    
+    def _get_meta_description(self, root):
+        meta_desc = root.find('.//meta[@name="description"]')
+        return meta_desc.get('content', '').strip() if meta_desc is not None else "No meta description"
+    
+    def _get_meta_keywords(self, root):
+        meta_keywords = root.find('.//meta[@name="keywords"]')
+        return meta_keywords.get('content', '').strip() if meta_keywords is not None else "No meta keywords"
+    
+    def _extract_all(self, root, base_url):
+        """Collect headers, main text, links and images in a single tree walk"""
+        headers = {f'h{i}': [] for i in range(1, 7)}
         links = []
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            full_url = urljoin(base_url, href)
-            link_text = link.text.strip()[:100]
-            links.append({
-                'text': link_text,
-                'url': full_url,
-                'is_internal': self._is_internal_url(full_url, base_url)
-            })
-        return links
-    
-    def _get_images(self, soup):
         images = []
-        for img in soup.find_all('img', src=True):
-            alt_text = img.get('alt', '')
-            images.append({
-                'src': img['src'],
-                'alt': alt_text,
-                'has_alt': bool(alt_text.strip())
-            })
-        return images
-    
-    def _is_internal_url(self, url, base_url):
-        base_domain = urlparse(base_url).netloc
-        url_domain = urlparse(url).netloc
-        return base_domain == url_domain or not url_domain
\ No newline at end of file
+        containers = {}
+        base_domain = urlsplit(base_url).netloc
+        
+        walker = etree.iterwalk(root, events=('start',))
+        for _, element in walker:
+            tag = element.tag
+            if tag in _HEADER_TAGS:
+                headers[tag].append(element.text_content().strip())
+            elif tag in _PRUNED_TAGS:
+                # Skip the section, but its headers still belong to the page outline
+                for header in element.iter(*_HEADER_TAGS):
+                    headers[header.tag].append(header.text_content().strip())
+                walker.skip_subtree()
+            elif tag == 'a':
+                href = element.get('href')
+                if href is not None:
+                    # Absolute links need no joining unless they have ./.. segments to resolve
+                    if href.startswith(('http://', 'https://')) and '/.' not in href:
+                        full_url = href
+                    else:
+                        full_url = urljoin(base_url, href)
+                    url_domain = urlsplit(full_url).netloc
+                    links.append(LinkRec(
+                        element.text_content().strip()[:100],
+                        full_url,
+                        url_domain == base_domain or not url_domain
+                    ))
+            elif tag == 'img':
+                src = element.get('src')
+                if src is not None:
+                    images.append(ImageRec(src, element.get('alt', '')))
+            elif tag in ('main', 'article', 'body') and tag not in containers:
+                containers[tag] = element
+        
+        # Remove the skipped sections in one C-level pass, keeping the text that follows them
+        etree.strip_elements(root, *_PRUNED_TAGS, with_tail=False)
+        
+        # Get text from main, article, or body
+        content = ""
+        for tag in ('main', 'article', 'body'):
+            if tag in containers:
+                content = ' '.join(text for text in (s.strip() for s in containers[tag].itertext()) if text)
+                break
+        return headers, content, links, images
+
+
+class AsyncWebScraper(WebScraper):
+    """WebScraper that fetches many pages concurrently over one shared HTTP client"""
+    
+    def _async_client(self, concurrency=_FETCH_CONCURRENCY):
+        """httpx client using HTTP/2 when h2 is installed"""
+        return httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=REQUEST_TIMEOUT,
+            follow_redirects=True,
+            http2=_HTTP2,
+            limits=httpx.Limits(max_connections=concurrency)
+        )
+    
+    async def _afetch(self, client, url):
+        """Fetch a URL with the async client and parse it off the event loop"""
+        try:
+            async with client.stream('GET', url) as response:
+                response.raise_for_status()
+                
+                # Check content type before downloading the body
+                content_type = response.headers.get('content-type', '').lower()
+                if 'text/html' not in content_type:
+                    return None, "URL does not return HTML content"
+                
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes(chunk_size=65536):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= MAX_HTML_BYTES:
+                        break
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            return None, f"Error fetching URL: {str(e)}"
+        
+        # Parsing is CPU-bound, so keep it from stalling the other downloads
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._parse_page, url, b''.join(chunks)[:MAX_HTML_BYTES], content_type,
+            response.status_code, response.elapsed.total_seconds()
+        )
+    
+    async def fetch_url_async(self, url):
+        """Fetch and parse a URL without blocking the event loop"""
+        async with self._async_client() as client:
+            return await self._afetch(client, url)
+    
+    async def fetch_many_async(self, urls, concurrency=_FETCH_CONCURRENCY):
+        """Fetch and parse several URLs, keeping at most `concurrency` requests in flight"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def bounded(client, url):
+            async with semaphore:
+                return await self._afetch(client, url)
+        
+        # One client for the whole batch so connections (and HTTP/2 streams) are reused
+        async with self._async_client(concurrency) as client:
+            return list(await asyncio.gather(*[bounded(client, url) for url in urls]))
+    
+    def fetch_many(self, urls, concurrency=_FETCH_CONCURRENCY):
+        """Synchronous wrapper around fetch_many_async, results in the order of `urls`"""
+        return asyncio.run(self.fetch_many_async(urls, concurrency))
+
+
+def _html_parser(encoding):
+    """This thread's reusable lxml HTML parser for `encoding`"""
+    by_encoding = getattr(_parsers, 'by_encoding', None)
+    if by_encoding is None:
+        by_encoding = _parsers.by_encoding = {}
+    
+    parser = by_encoding.get(encoding)
+    if parser is None:
+        parser = by_encoding[encoding] = lxml_html.HTMLParser(encoding=encoding)
+    return parser
+
+
+def _copy_page(data):
+    """Copy of page data deep enough that callers can't change a cached parse"""
+    # Link and image records are immutable tuples, so copying the lists is enough
+    return dict(
+        data,
+        headers={level: list(texts) for level, texts in data['headers'].items()},
+        links=list(data['links']),
+        images=list(data['images'])
+    )
+
+
+def get_scraper():
+    """Shared WebScraper, so every caller reuses one session and connection pool"""
+    global _default_scraper
+    if _default_scraper is None:
+        _default_scraper = WebScraper()
+    return _default_scraper